@@ -1,11 +1,16 @@
 import anthropic
 import asyncio
+import httpx
 import os
+import collections
 import dotenv
-import sys 
+import itertools
+import orjson
+import sys
 import typing
 
 from tool_executor import ToolExecutor
+from tools.tool_base import ToolBase
 # Import tool classes from the tools package
 from tools import (
     CalculatorTool,
@@ -20,25 +25,31 @@ from tools import (
     # TimeUnit
 )
 
-from rich.console import Console
+from pygments.lexers.data import JsonLexer
+from prompt_toolkit import PromptSession
+from prompt_toolkit.formatted_text import HTML
+from rich.console import Console, Group
 from rich.panel import Panel
 from rich.syntax import Syntax
+from rich.text import Text
 from rich.live import Live
 from rich.spinner import Spinner
 from loguru import logger
 
+dotenv.load_dotenv()
+
 # --- Loguru Configuration ---
 logger.remove() 
 logger.add(sys.stderr, level="ERROR") # Only errors and critical to console
-logger.add("calc_agent.log", rotation="10 MB", level="DEBUG") 
+# File writes happen on loguru's background worker so disk I/O never blocks the event loop
+logger.add("calc_agent.log", rotation="10 MB", level=os.getenv("LOG_LEVEL", "INFO"), enqueue=True, backtrace=False, diagnose=False)
 # ---
 
 # --- Rich Console Initialization ---
 console = Console()
+JSON_LEXER = JsonLexer() # Built once and reused for every tool call preview
 # ---
 
-dotenv.load_dotenv()
-
 # --- Anthropic Client Initialization ---
 # It's good practice to check if the API key exists
 api_key = os.getenv("CLAUDE_API_KEY")
@@ -46,7 +57,13 @@ if not api_key:
     logger.critical("CLAUDE_API_KEY not found in environment variables.")
     console.print("[bold red]Error: CLAUDE_API_KEY not found. Please set it in your .env file.[/bold red]")
     sys.exit(1)
-client = anthropic.Anthropic(api_key=api_key)
+# One pooled HTTP/2 connection is reused for every request instead of a fresh TLS handshake per call
+http_client = anthropic.DefaultAsyncHttpxClient(
+    http2=True,
+    timeout=60,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+)
+client = anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client)
 # ---
 
 # --- ToolExecutor Initialization and Tool Registration ---
@@ -58,36 +75,182 @@ tool_executor.register_tool(TimeConversionTool())
 tool_executor.register_tool(CreateDirectoryTool())
 tool_executor.register_tool(HTMLGeneratorTool())
 tool_executor.register_tool(PlanningTool())
+
+# All tools are registered above, so their schemas are built once instead of on every API call
+TOOL_SCHEMAS = tool_executor.get_all_tool_schemas()
+# ---
+
+# --- Static API Parameters ---
+# Prompt caching: a breakpoint caches everything up to and including the marked block
+EPHEMERAL_CACHE_CONTROL = {"type": "ephemeral"}
+
+# Fields shared by every request; each call only adds its messages (and optional system prompt)
+STATIC_API_PARAMS = {
+    "model": "claude-3-haiku-20240307", # Reverted to a known good model for now, user can change back
+    "max_tokens": 2048, # Reverted for now
+    # Marking the last tool caches the whole tool list prefix
+    "tools": TOOL_SCHEMAS[:-1] + [{**TOOL_SCHEMAS[-1], "cache_control": EPHEMERAL_CACHE_CONTROL}],
+}
 # ---
 
 MAX_TOOL_ITERATIONS_PER_TURN = 5 # Max tool uses before forcing a text response or ending turn
+HISTORY_COMPACTION_THRESHOLD = 30 # History length that triggers folding older messages into a summary
+HISTORY_KEEP_MESSAGES = 20 # Most recent messages kept verbatim when history is compacted
+SUMMARY_MODEL = "claude-3-haiku-20240307" # Cheap model used to summarize older conversation history
+SMALL_TOOL_INPUT_CHARS = 80 # Tool inputs shorter than this (as JSON) are shown without syntax highlighting
+MAX_CONCURRENT_TOOL_CALLS = 8 # Upper bound on tools running at once; some tools call Claude themselves
+
+# --- Response Streaming ---
+async def stream_response(live: Live, **api_params: typing.Any) -> typing.Any:
+    """Streams a Claude response into `live` and returns the final message."""
+    # Render text as it is generated and flag tool calls as soon as their block starts;
+    # the final message is still used for tool routing
+    # Deltas are collected and joined once per preview; += could not grow the string in place
+    # while the previous preview Panel still references it
+    streamed_parts = []
+    pending_tool_name = None
+    async with client.messages.stream(**api_params) as stream:
+        async for event in stream:
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                streamed_parts.append(event.delta.text)
+            elif event.type == "content_block_start" and event.content_block.type == "tool_use":
+                pending_tool_name = event.content_block.name
+            else:
+                continue
+            preview = [Panel("".join(streamed_parts), title="[bold green]Claude[/bold green]")] if streamed_parts else []
+            if pending_tool_name:
+                preview.append(Spinner("dots", text=f"Preparing tool call: {pending_tool_name}..."))
+            live.update(Group(*preview))
+        return await stream.get_final_message()
+# ---
+
+# --- History Compaction ---
+def format_transcript(messages: list) -> str:
+    """Flattens API messages into plain text for the summarizer."""
+    lines = []
+    for message in messages:
+        role = message["role"]
+        content = message["content"]
+        if isinstance(content, str):
+            lines.append(f"{role}: {content}")
+            continue
+        for block in content:
+            if block["type"] == "text":
+                lines.append(f"{role}: {block['text']}")
+            elif block["type"] == "tool_use":
+                lines.append(f"{role} called tool {block['name']} with input {block['input']}")
+            elif block["type"] == "tool_result":
+                lines.append(f"tool result: {block['content']}")
+    return "\n".join(lines)
+
+async def summarize_messages(messages: list) -> str:
+    """Summarizes older messages with a cheap model call."""
+    transcript = format_transcript(messages)
+    logger.debug(f"Summarizing {len(messages)} older messages.")
+    response = await client.messages.create(
+        model=SUMMARY_MODEL,
+        max_tokens=512,
+        messages=[{
+            "role": "user",
+            "content": "Summarize the following conversation between a user and an assistant in a few sentences. "
+                       "Keep any numbers, results, file paths and open questions.\n\n" + transcript,
+        }],
+    )
+    return " ".join(block.text for block in response.content if block.type == "text").strip()
+
+async def compact_history(messages: typing.Deque[dict]) -> None:
+    """Folds all but the most recent messages into a summary, modifying messages in place.
+
+    The summary replaces the older messages in the stored history, so later
+    compactions only summarize that summary plus what has been added since.
+    """
+    if len(messages) <= HISTORY_COMPACTION_THRESHOLD:
+        return
+
+    # Only cut at a plain user message so tool_use / tool_result pairs are never split
+    window_start = 0
+    for i in range(len(messages) - HISTORY_KEEP_MESSAGES, 0, -1):
+        if messages[i]["role"] == "user" and isinstance(messages[i]["content"], str):
+            window_start = i
+            break
+    if window_start == 0:
+        return
 
-async def execute_conversation_turn(messages_for_api: list, system_prompt: typing.Optional[str] = None) -> list:
+    summary = await summarize_messages(list(itertools.islice(messages, window_start)))
+    first_kept = messages[window_start]
+    summarized_first = {"role": "user", "content": f"[Summary of earlier conversation]: {summary}\n\n{first_kept['content']}"}
+    for _ in range(window_start + 1):
+        messages.popleft() # O(1) per dropped message
+    messages.appendleft(summarized_first)
+    logger.info(f"Compacted {window_start} older messages into a summary.")
+# ---
+
+def with_cache_breakpoint(messages: list) -> list:
+    """Returns a copy of messages with the last content block marked for prompt caching."""
+    if not messages:
+        return messages
+    last_message = messages[-1]
+    content = last_message["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    content = content[:-1] + [{**content[-1], "cache_control": EPHEMERAL_CACHE_CONTROL}]
+    return messages[:-1] + [{**last_message, "content": content}]
+
+def print_tool_call(tool_name: str, tool_input: dict) -> None:
+    """Shows a requested tool call, only paying for syntax highlighting on larger inputs in a terminal."""
+    title = f"[bold yellow]Tool Call Requested: {tool_name}[/bold yellow]"
+    # Typical inputs (conversions, arithmetic) are tiny and read fine as one plain line
+    compact_json = orjson.dumps(tool_input, default=str).decode()
+    if len(compact_json) < SMALL_TOOL_INPUT_CHARS:
+        # Text, not a plain str, so brackets in the input are shown as-is rather than parsed as Rich markup
+        console.print(Panel(Text(compact_json), title=title))
+        return
+    # Real JSON (not the dict repr) so the JSON lexer highlights it without error recovery
+    tool_input_json = orjson.dumps(tool_input, option=orjson.OPT_INDENT_2, default=str).decode()
+    if not console.is_terminal:
+        console.print(Panel(Text(tool_input_json), title=title))
+        return
+    tool_input_str = Syntax(tool_input_json, JSON_LEXER, theme="paraiso-dark", line_numbers=True, background_color="#2b2b2b")
+    console.print(Panel(tool_input_str, title=title))
+
+async def run_tool(tool_name: str, tool_input: dict, semaphore: asyncio.Semaphore, serial_lock: asyncio.Lock) -> typing.Any:
+    """Runs a tool without blocking the event loop so several calls can overlap."""
+    logger.info(f"Executing tool: {tool_name} with input: {tool_input}")
+    if tool_executor.is_parallel_safe(tool_name):
+        async with semaphore:
+            return await tool_executor.aexecute_tool(tool_name, **tool_input)
+    # Tools that are not parallel-safe run one at a time, in the order Claude requested them.
+    # The lock comes first so serial calls waiting their turn don't hold semaphore slots.
+    async with serial_lock, semaphore:
+        return await tool_executor.aexecute_tool(tool_name, **tool_input)
+
+async def execute_conversation_turn(messages_for_api: typing.Deque[dict], system_prompt: typing.Optional[str] = None) -> typing.Deque[dict]:
     """Processes a single turn, appends assistant's response to messages_for_api and returns it."""
     logger.debug(f"Executing turn. Current messages for API depth: {len(messages_for_api)}")
-    logger.debug(f"Messages before API call: {messages_for_api}")
+    logger.opt(lazy=True).debug("Messages before API call: {}", lambda: orjson.dumps(list(messages_for_api), default=str).decode())
     if system_prompt:
         logger.debug(f"Using system prompt for this turn: {system_prompt}")
 
     for _ in range(MAX_TOOL_ITERATIONS_PER_TURN):
         assistant_response_content_blocks = []
+        # Blocks are also partitioned by type as they are built, so later checks need no rescans
+        text_blocks = []
+        tool_use_blocks = []
         full_claude_response_obj = None
-        text_generated_this_iteration = False
-        tool_calls_made_this_iteration = False
 
-        with Live(Spinner("dots", text="Claude is thinking..."), console=console, transient=True, refresh_per_second=10):
+        with Live(Spinner("dots", text="Claude is thinking..."), console=console, transient=True, refresh_per_second=10) as live:
             try:
+                await compact_history(messages_for_api)
                 api_params = {
-                    "model": "claude-3-haiku-20240307", # Reverted to a known good model for now, user can change back
-                    "max_tokens": 2048, # Reverted for now
-                    "tools": tool_executor.get_all_tool_schemas(),
-                    "messages": messages_for_api, # Use the passed list directly for the API call
+                    **STATIC_API_PARAMS,
+                    # The latest message is a cache breakpoint for the next call
+                    "messages": with_cache_breakpoint(list(messages_for_api)),
                 }
                 if system_prompt:
-                    api_params["system"] = system_prompt
+                    api_params["system"] = [{"type": "text", "text": system_prompt, "cache_control": EPHEMERAL_CACHE_CONTROL}]
                 
-                full_claude_response_obj = client.messages.create(**api_params)
-                logger.debug(f"Claude raw response object: {full_claude_response_obj}")
+                full_claude_response_obj = await stream_response(live, **api_params)
+                logger.opt(lazy=True).debug("Claude raw response object: {}", lambda: str(full_claude_response_obj)[:2000])
             except anthropic.APIError as e:
                 logger.error(f"Anthropic API Error: {e}")
                 console.print(Panel(f"[bold red]API Error:[/bold red] {e}", title="[bold red]Error[/bold red]"))
@@ -104,48 +267,44 @@ async def execute_conversation_turn(messages_for_api: list, system_prompt: typin
             if content_block.type == "text":
                 console.print(Panel(content_block.text, title="[bold green]Claude[/bold green]"))
                 logger.info(f"Claude says: {content_block.text}")
-                assistant_response_content_blocks.append({"type": "text", "text": content_block.text})
-                text_generated_this_iteration = True
+                text_block = {"type": "text", "text": content_block.text}
+                assistant_response_content_blocks.append(text_block)
+                text_blocks.append(text_block)
             elif content_block.type == "tool_use":
-                tool_calls_made_this_iteration = True
                 logger.info(f"Claude requests tool: {content_block.name} with input: {content_block.input}")
-                try:
-                    tool_input_str = Syntax(str(content_block.input), "json", theme="paraiso-dark", line_numbers=True, background_color="#2b2b2b")
-                    console.print(Panel(tool_input_str, title=f"[bold yellow]Tool Call Requested: {content_block.name}[/bold yellow]"))
-                except Exception:
-                    console.print(Panel(str(content_block.input), title=f"[bold yellow]Tool Call Requested: {content_block.name}[/bold yellow]"))
-                assistant_response_content_blocks.append({"type": "tool_use", "id": content_block.id, "name": content_block.name, "input": content_block.input})
+                print_tool_call(content_block.name, content_block.input)
+                tool_use_block = {"type": "tool_use", "id": content_block.id, "name": content_block.name, "input": content_block.input}
+                assistant_response_content_blocks.append(tool_use_block)
+                tool_use_blocks.append(tool_use_block)
+        text_generated_this_iteration = bool(text_blocks)
+        tool_calls_made_this_iteration = bool(tool_use_blocks)
         
         if assistant_response_content_blocks:
             messages_for_api.append({"role": "assistant", "content": assistant_response_content_blocks})
-            logger.debug(f"Appended assistant response to messages_for_api: {assistant_response_content_blocks}")
+            logger.opt(lazy=True).debug("Appended assistant response to messages_for_api: {}", lambda: orjson.dumps(assistant_response_content_blocks, default=str).decode())
 
         if full_claude_response_obj.stop_reason == "tool_use":
             tool_results_for_next_iteration = []
-            actual_tool_use_found = False
-            # Iterate over the assistant message we *just added* to messages_for_api
-            last_assistant_message_content = messages_for_api[-1]["content"]
-            for block in last_assistant_message_content:
-                if block["type"] == "tool_use":
-                    actual_tool_use_found = True
-                    tool_name = block["name"]
-                    tool_input = block["input"]
-                    tool_use_id = block["id"]
-                    
-                    logger.info(f"Executing tool: {tool_name} with input: {tool_input}")
-                    result = tool_executor.execute_tool(tool_name, **tool_input)
-                    logger.info(f"Tool '{tool_name}' result: {result}")
-                    console.print(Panel(str(result), title=f"[bold magenta]Tool Result: {tool_name}[/bold magenta]"))
-                    
-                    tool_results_for_next_iteration.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": str(result), 
-                    })
-            
-            if actual_tool_use_found and tool_results_for_next_iteration:
+
+            # Independent tool calls from the same response are run concurrently; gather keeps their order
+            tool_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+            serial_lock = asyncio.Lock()
+            results = await asyncio.gather(*(run_tool(block["name"], block["input"], tool_semaphore, serial_lock) for block in tool_use_blocks))
+            for block, result in zip(tool_use_blocks, results):
+                tool_name = block["name"]
+                result_str = result if isinstance(result, str) else str(result) # Converted once for display and the API
+                logger.info(f"Tool '{tool_name}' result: {result_str}")
+                console.print(Panel(result_str, title=f"[bold magenta]Tool Result: {tool_name}[/bold magenta]"))
+
+                tool_results_for_next_iteration.append({
+                    "type": "tool_result",
+                    "tool_use_id": block["id"],
+                    "content": result_str,
+                })
+
+            if tool_calls_made_this_iteration and tool_results_for_next_iteration:
                 messages_for_api.append({"role": "user", "content": tool_results_for_next_iteration})
-                logger.debug(f"Appended tool results for next API call: {tool_results_for_next_iteration}")
+                logger.opt(lazy=True).debug("Appended tool results for next API call: {}", lambda: orjson.dumps(tool_results_for_next_iteration, default=str).decode())
                 # Continue loop for Claude to process tool results
             else: # No tool use found, or no results generated. Stop this turn.
                 logger.warning("Tool use indicated by stop_reason, but no valid tool calls/results processed. Ending turn.")
@@ -172,53 +331,69 @@ async def execute_conversation_turn(messages_for_api: list, system_prompt: typin
     return messages_for_api
 
 async def main_repl():
-    console.print(Panel("[bold]Calc Agent Initializing...[/bold]", title_align="center"))
+    try:
+        console.print(Panel("[bold]Calc Agent Initializing...[/bold]", title_align="center"))
     
-    overall_messages_history = [] # This will maintain the full conversation history
+        overall_messages_history = collections.deque() # This will maintain the full conversation history
 
-    welcome_system_prompt = "You are a helpful and friendly assistant. Start your very first message with the exact phrase: 'Welcome, I am your assistant!'. After this greeting, you can ask how you can help or wait for their first query. Do not use any tools for this initial greeting."
-    logger.info(f"Defined system prompt for welcome: {welcome_system_prompt}")
+        welcome_system_prompt = "You are a helpful and friendly assistant. Start your very first message with the exact phrase: 'Welcome, I am your assistant!'. After this greeting, you can ask how you can help or wait for their first query. Do not use any tools for this initial greeting."
+        logger.info(f"Defined system prompt for welcome: {welcome_system_prompt}")
 
-    # Prepare messages for the very first API call (welcome message)
-    initial_user_greeting_message = {"role": "user", "content": "Greetings, assistant!"}
-    messages_for_welcome_call = [initial_user_greeting_message]
-    logger.info(f"Messages for welcome call: {messages_for_welcome_call}")
+        # Prepare messages for the very first API call (welcome message)
+        initial_user_greeting_message = {"role": "user", "content": "Greetings, assistant!"}
+        messages_for_welcome_call = collections.deque([initial_user_greeting_message])
+        logger.info(f"Messages for welcome call: {list(messages_for_welcome_call)}")
 
-    console.print(Panel("[italic]Claude is preparing its welcome message...[/italic]"))
-    # Get the welcome response; execute_conversation_turn will append Claude's response to messages_for_welcome_call
-    updated_messages_after_welcome = await execute_conversation_turn(messages_for_welcome_call, system_prompt=welcome_system_prompt)
-    overall_messages_history.extend(updated_messages_after_welcome) # Add the initial exchange to overall history
+        console.print(Panel("[italic]Claude is preparing its welcome message...[/italic]"))
+        # Get the welcome response; execute_conversation_turn will append Claude's response to messages_for_welcome_call
+        updated_messages_after_welcome = await execute_conversation_turn(messages_for_welcome_call, system_prompt=welcome_system_prompt)
+        overall_messages_history.extend(updated_messages_after_welcome) # Add the initial exchange to overall history
 
-    console.print(Panel("[bold cyan]Interactive session started. Type 'exit' to end.[/bold cyan]"))
+        console.print(Panel("[bold cyan]Interactive session started. Type 'exit' to end.[/bold cyan]"))
 
-    loop = asyncio.get_event_loop()
-    while True:
-        try:
-            user_input = await loop.run_in_executor(None, console.input, "[bold cyan]User[/bold cyan]: ")
-        except KeyboardInterrupt:
-            console.print("\n[bold orange]Exiting on KeyboardInterrupt...[/bold orange]")
-            break
-        except EOFError: 
-            console.print("\n[bold orange]Exiting on EOF...[/bold orange]")
-            break
+        # prompt_toolkit reads input on the event loop itself, so no thread is tied up waiting on stdin
+        prompt_session = PromptSession()
+        while True:
+            try:
+                user_input = await prompt_session.prompt_async(HTML("<ansicyan><b>User</b></ansicyan>: "))
+            except KeyboardInterrupt:
+                console.print("\n[bold orange]Exiting on KeyboardInterrupt...[/bold orange]")
+                break
+            except EOFError: 
+                console.print("\n[bold orange]Exiting on EOF...[/bold orange]")
+                break
 
-        if user_input.strip().lower() == "exit":
-            console.print("[bold orange]Exiting agent.[/bold orange]")
-            break
+            if user_input.strip().lower() == "exit":
+                console.print("[bold orange]Exiting agent.[/bold orange]")
+                break
         
-        if not user_input.strip(): 
-            continue
+            if not user_input.strip(): 
+                continue
 
-        logger.info(f"User REPL Input: {user_input}")
-        overall_messages_history.append({"role": "user", "content": user_input})
+            logger.info(f"User REPL Input: {user_input}")
+            overall_messages_history.append({"role": "user", "content": user_input})
         
-        # Pass the current state of overall_messages_history for the API call
-        # execute_conversation_turn will modify and return it
-        overall_messages_history = await execute_conversation_turn(overall_messages_history) 
+            # Pass the current state of overall_messages_history for the API call
+            # execute_conversation_turn will modify and return it
+            overall_messages_history = await execute_conversation_turn(overall_messages_history) 
+
+    finally:
+        # Runs on every exit, including errors and cancellation, so no connection pool is left open
+        await http_client.aclose()
+        await ToolBase.aclose_shared_clients()
 
 if __name__ == "__main__":
+    # uvloop is optional (not available on Windows); fall back to the default event loop without it
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        logger.debug("uvloop not installed, using the default asyncio event loop.")
+
     try:
         asyncio.run(main_repl())
     except Exception as e:
-        logger.critical(f"Unhandled exception in main_repl: {e}", exc_info=True)
-        console.print(Panel(f"[bold red]Critical Error in REPL:[/bold red] {e}", title="[bold red]System Failure[/bold red]"))
\ No newline at end of file
+        logger.opt(exception=e).critical(f"Unhandled exception in main_repl: {e}")
+        console.print(Panel(f"[bold red]Critical Error in REPL:[/bold red] {e}", title="[bold red]System Failure[/bold red]"))
+    finally:
+        logger.complete() # Flush messages still queued for the file sink
\ No newline at end of file
@@ -1,10 +1,23 @@
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, FrozenSet, Union
 from tools.tool_base import ToolBase
 from loguru import logger # Import loguru
 
+# Most distinct cacheable-tool calls kept before the least recently used result is evicted
+RESULT_CACHE_SIZE = 256
+
+_ResultCacheKey = Tuple[str, FrozenSet[Tuple[str, type, Any]]]
+
+class _PreparedCall(NamedTuple):
+    tool_instance: ToolBase
+    tool_kwargs: Dict[str, Any]
+    cache_key: Optional[_ResultCacheKey]
+
 class ToolExecutor:
     def __init__(self):
         self.tools: Dict[str, ToolBase] = {}
+        # Results of cacheable (pure) tools, keyed by tool name and validated input; bounded LRU
+        self._result_cache: "OrderedDict[_ResultCacheKey, Any]" = OrderedDict()
 
     def register_tool(self, tool_instance: ToolBase):
         if not isinstance(tool_instance, ToolBase):
@@ -12,33 +25,79 @@ class ToolExecutor:
             logger.error(f"Attempted to register invalid tool type: {type(tool_instance)}")
             raise ValueError("Provided tool must be an instance of a class derived from ToolBase")
         self.tools[tool_instance.name] = tool_instance
-        logger.info(f"Registered tool: {tool_instance.name}") # Use logger
+        logger.debug(f"Registered tool: {tool_instance.name}")
 
-    def execute_tool(self, name: str, **kwargs: Any) -> Any:
-        if name not in self.tools:
+    def _result_cache_key(self, tool_instance: ToolBase, name: str, tool_kwargs: Dict[str, Any]) -> Optional[_ResultCacheKey]:
+        if not tool_instance.cacheable:
+            return None
+        try:
+            # Value types are part of the key, since 1, 1.0 and True hash and compare equal
+            return (name, frozenset((field, type(value), value) for field, value in tool_kwargs.items()))
+        except TypeError: # Unhashable input values (lists, dicts) are simply not cached
+            return None
+
+    def _record_result(self, name: str, cache_key: Any, result: Any) -> Any:
+        logger.success(f"Tool '{name}' executed successfully. Result: {result}")
+        if cache_key is not None:
+            self._result_cache[cache_key] = result
+            self._result_cache.move_to_end(cache_key)
+            if len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False) # Evict least recently used
+        return result
+
+    def _execution_error(self, name: str, e: Exception) -> str:
+        logger.error(f"Error executing tool '{name}'. Details: {e}")
+        return f"Error executing tool '{name}': {e}"
+
+    def _prepare_call(self, name: str, kwargs: Dict[str, Any]) -> Union[_PreparedCall, Any]:
+        """Looks up, validates and cache-checks a call shared by execute_tool and aexecute_tool.
+        Returns a _PreparedCall to run, or the final result when the tool does not need to run."""
+        tool_instance = self.tools.get(name) # Single lookup instead of a membership test plus index
+        if tool_instance is None:
             logger.error(f"Tool '{name}' not found during execution attempt.")
             return f"Error: Tool '{name}' not found."
-        
-        tool_instance = self.tools[name]
-        logger.debug(f"Attempting to execute tool: {name} with input: {kwargs}")
+
+        logger.opt(lazy=True).debug("Attempting to execute tool: {} with input: {}", lambda: name, lambda: kwargs)
         try:
-            # The input for the tool execute method will be the validated and parsed model
-            # For Pydantic v2, it's model_validate, for v1 it was parse_obj
-            # Assuming Pydantic v2+ as it's more current
-            validated_input = tool_instance.input_schema.model_validate(kwargs) 
+            tool_kwargs = tool_instance.validate_input(kwargs)
         except Exception as e: # Catches Pydantic ValidationError
              logger.error(f"Invalid input for tool '{name}'. Details: {e}. Input: {kwargs}")
              return f"Error: Invalid input for tool '{name}'. Details: {e}"
 
+        # Keyed on the validated input, so coerced and defaulted values match their canonical form
+        cache_key = self._result_cache_key(tool_instance, name, tool_kwargs)
+        if cache_key is not None and cache_key in self._result_cache:
+            logger.debug(f"Tool '{name}' result served from cache.")
+            self._result_cache.move_to_end(cache_key)
+            return self._result_cache[cache_key]
+        return _PreparedCall(tool_instance, tool_kwargs, cache_key)
+
+    def execute_tool(self, name: str, **kwargs: Any) -> Any:
+        call = self._prepare_call(name, kwargs)
+        if not isinstance(call, _PreparedCall):
+            return call
         try:
             # Pass the validated and structured input to the tool's execute method
-            # Pydantic model_dump() converts the model instance to a dict
-            result = tool_instance.execute(**validated_input.model_dump())
-            logger.success(f"Tool '{name}' executed successfully. Result: {result}")
-            return result
+            return self._record_result(name, call.cache_key, call.tool_instance.execute(**call.tool_kwargs))
         except Exception as e:
-            logger.error(f"Error executing tool '{name}'. Details: {e}")
-            return f"Error executing tool '{name}': {e}"
+            return self._execution_error(name, e)
+
+    async def aexecute_tool(self, name: str, **kwargs: Any) -> Any:
+        """Async counterpart of execute_tool; awaits the tool's aexecute so the event loop stays free."""
+        call = self._prepare_call(name, kwargs)
+        if not isinstance(call, _PreparedCall):
+            return call
+        try:
+            # Network-bound tools implement aexecute natively; the rest run execute in the default executor
+            return self._record_result(name, call.cache_key, await call.tool_instance.aexecute(**call.tool_kwargs))
+        except Exception as e:
+            return self._execution_error(name, e)
+
+    def is_parallel_safe(self, name: str) -> bool:
+        tool_instance = self.tools.get(name)
+        # Unknown tools just return an error string, so they are safe to run concurrently
+        return tool_instance is None or tool_instance.parallel_safe
 
     def get_all_tool_schemas(self) -> List[Dict[str, Any]]:
-        return [tool.get_anthropic_schema() for tool in self.tools.values()] 
\ No newline at end of file
+        # Each tool class builds its schema once, so this is only a list of cached dicts
+        return [tool.get_anthropic_schema() for tool in self.tools.values()]
\ No newline at end of file
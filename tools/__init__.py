@@ -1,20 +1,50 @@
-from .calculator_tool import CalculatorTool
-from .percentage_tool import PercentageTool
-from .temperature_conversion_tool import TemperatureConversionTool, TemperatureUnit
-from .time_conversion_tool import TimeConversionTool, TimeUnit
-from .directory_tool import CreateDirectoryTool
-from .html_generator_tool import HTMLGeneratorTool
-from .planning_tool import PlanningTool
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .calculator_tool import CalculatorTool
+    from .percentage_tool import PercentageTool
+    from .temperature_conversion_tool import TemperatureConversionTool, TemperatureUnit
+    from .time_conversion_tool import TimeConversionTool, TimeUnit
+    from .directory_tool import CreateDirectoryTool
+    from .html_generator_tool import HTMLGeneratorTool
+    from .planning_tool import PlanningTool
+
+# Tool modules are imported on first attribute access (PEP 562), so importing the package
+# loads only the tools a consumer actually names. main.py registers every tool at startup,
+# so it still imports them all (and the anthropic SDK with the sub-Claude tools).
+_LAZY_IMPORTS = {
+    "CalculatorTool": ".calculator_tool",
+    "PercentageTool": ".percentage_tool",
+    "TemperatureConversionTool": ".temperature_conversion_tool",
+    "TemperatureUnit": ".temperature_conversion_tool",
+    "TimeConversionTool": ".time_conversion_tool",
+    "TimeUnit": ".time_conversion_tool",
+    "CreateDirectoryTool": ".directory_tool",
+    "HTMLGeneratorTool": ".html_generator_tool",
+    "PlanningTool": ".planning_tool",
+}
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value # Cache so later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
 
 # Make enums accessible for type hinting if needed elsewhere, though main.py will get them from tool inputs
 __all__ = [
-    "CalculatorTool", 
-    "PercentageTool", 
-    "TemperatureConversionTool", 
-    "TemperatureUnit", 
-    "TimeConversionTool", 
+    "CalculatorTool",
+    "PercentageTool",
+    "TemperatureConversionTool",
+    "TemperatureUnit",
+    "TimeConversionTool",
     "TimeUnit",
     "CreateDirectoryTool",
     "HTMLGeneratorTool",
     "PlanningTool"
-] 
\ No newline at end of file
+]
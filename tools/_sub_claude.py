@@ -0,0 +1,85 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, TextIO, Tuple, TypeVar
+
+# Helpers shared by the tools that call another Claude (HTML and plan generation)
+
+# Haiku 3.5 is fast and follows output-format instructions more reliably than Haiku 3.
+# If it is not available on your account, fall back to "claude-3-haiku-20240307".
+SUB_CLAUDE_MODEL = "claude-3-5-haiku-20241022"
+
+def generation_params(system_prompt: str, prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """Builds the messages request for a sub-Claude call."""
+    # Instructions go in the system prompt, which Claude follows more reliably than inline text;
+    # the user turn carries only the caller's prompt
+    return {
+        "model": SUB_CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "system": system_prompt,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+def sub_client_api_key() -> str:
+    # Read when a shared sub-client is first built rather than at import: main.py imports the
+    # tools before it loads .env, so an import-time read would miss a key that lives there
+    api_key = os.getenv("CLAUDE_API_KEY")
+    if not api_key:
+        raise RuntimeError("CLAUDE_API_KEY not found for the sub-Claude client.")
+    return api_key
+
+# Directories already created by open_for_write, so repeat saves skip makedirs' stat per path component
+_MKDIR_CACHE: Set[str] = set()
+
+_T = TypeVar("_T")
+
+def _with_parent_dir(file_path: str, open_file: Callable[[], _T]) -> _T:
+    dir_name = os.path.dirname(file_path)
+    if dir_name and dir_name not in _MKDIR_CACHE:
+        os.makedirs(dir_name, exist_ok=True)
+        _MKDIR_CACHE.add(dir_name)
+    try:
+        return open_file()
+    except FileNotFoundError:
+        if not dir_name:
+            raise
+        # The cached directory was removed since it was created; make it again
+        os.makedirs(dir_name, exist_ok=True)
+        return open_file()
+
+def open_for_write(file_path: str) -> TextIO:
+    """Opens file_path for writing as UTF-8 text, creating its parent directory if needed."""
+    return _with_parent_dir(file_path, lambda: open(file_path, "w", encoding="utf-8"))
+
+def open_temp_for_write(file_path: str) -> Tuple[TextIO, str]:
+    """Creates a uniquely named temporary file beside file_path and returns it, open for UTF-8 text, with its path.
+    Callers move it into place with os.replace once the content is complete."""
+    # A unique name per call keeps concurrent writes to the same file_path apart; exclusive
+    # creation (rather than mkstemp) keeps the usual umask-based permissions for the final file
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    return _with_parent_dir(file_path, lambda: open(tmp_path, "x", encoding="utf-8")), tmp_path
+
+class PromptCache:
+    """Bounded LRU of sub-Claude outputs, keyed by the exact prompt string, so a repeated request
+    skips the sub-Claude round trip."""
+
+    def __init__(self, maxsize: int = 64):
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        # Sync execute calls run on executor threads, so guard the LRU bookkeeping
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(prompt)
+            if value is not None:
+                self._entries.move_to_end(prompt)
+            return value
+
+    def put(self, prompt: str, value: str) -> None:
+        with self._lock:
+            self._entries[prompt] = value
+            self._entries.move_to_end(prompt)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False) # Evict least recently used
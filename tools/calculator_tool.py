@@ -1,6 +1,16 @@
+import operator
 from pydantic import BaseModel, Field
 from .tool_base import ToolBase # Relative import
-from typing import Any
+from typing import Any, Callable, Dict
+
+# Operator symbol -> arithmetic function, looked up once per call instead of an if/elif chain
+_OPS: Dict[str, Callable[[float, float], float]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "^": operator.pow,
+}
 
 class CalculatorInput(BaseModel):
     num1: float = Field(..., description="The first number.")
@@ -11,22 +21,15 @@ class CalculatorTool(ToolBase):
     name = "calculate"
     description = "A calculator for basic arithmetic operations: addition (+), subtraction (-), multiplication (*), and division (/)."
     input_schema = CalculatorInput
+    cacheable = True
 
     def execute(self, num1: float, num2: float, operator: str, **kwargs: Any) -> Any:
-        if operator == "+":
-            return num1 + num2
-        elif operator == "-":
-            return num1 - num2
-        elif operator == "*":
-            return num1 * num2
-        elif operator == "/":
-            if num2 == 0:
-                return "Error: Division by zero"
-            return num1 / num2
-        elif operator == "^":
-            return num1 ** num2
-        else:
+        op_fn = _OPS.get(operator)
+        if op_fn is None:
             return "Invalid operator"
+        if operator == "/" and num2 == 0:
+            return "Error: Division by zero"
+        return op_fn(num1, num2)
 
 # The old schema dictionary is no longer needed here, it will be generated by ToolBase
 # calculator_schema = {
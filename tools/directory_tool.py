@@ -14,6 +14,10 @@ class CreateDirectoryTool(ToolBase):
 
     def execute(self, directory_path: str, **kwargs: Any) -> str:
         try:
+            # A single stat answers repeat requests; makedirs would stat every path segment
+            if os.path.isdir(directory_path):
+                logger.info(f"Directory already existed: {directory_path}")
+                return f"Directory already existed: {directory_path}"
             os.makedirs(directory_path, exist_ok=True)
             logger.success(f"Successfully created directory (or it already existed): {directory_path}")
             return f"Successfully created directory (or it already existed): {directory_path}"
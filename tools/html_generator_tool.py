@@ -1,12 +1,148 @@
+import asyncio
 import os
 import anthropic # For the sub-Claude call
 from pydantic import BaseModel, Field
-from typing import Any
+from typing import Any, Dict, List, Optional
+from ._sub_claude import PromptCache, generation_params, open_temp_for_write
 from .tool_base import ToolBase
 from loguru import logger
 
-# Ensure API key is available for the sub-client
-SUB_CLIENT_API_KEY = os.getenv("CLAUDE_API_KEY")
+# Generation stops as soon as the document is closed, skipping any trailing fence or commentary.
+# The API omits the matched stop sequence from the output, so it is written back afterwards.
+_CLOSING_TAG = "</html>"
+
+# Asks for bare HTML; _FenceStripper covers the responses that are still fenced
+_HTML_SYSTEM_PROMPT = (
+    "Generate complete, well-formed HTML code based on the user's request.\n"
+    "Only output the HTML code itself, with no other explanatory text, preamble, or markdown code fences.\n"
+    "Ensure all tags are properly closed and the structure is valid.\n"
+    "Include CSS within <style> tags in the <head> if styling is requested or implied by the request.\n"
+    "If JavaScript is needed for simple interactivity as per the request, include it within <script> tags at the end of the <body>."
+)
+
+_prompt_cache = PromptCache()
+
+class _FenceStripper:
+    """Strips a wrapping markdown code fence (```html or ```) and surrounding whitespace from streamed text,
+    holding back only what it must."""
+    _FENCE = "```"
+    _OPENING_FENCES = ("```html", "```") # Longest first; a newline after the fence goes with the leading whitespace
+
+    def __init__(self):
+        self._head = "" # Buffered until we know whether the text opens with a fence
+        self._in_head = True
+        self._leading = True # Still dropping leading whitespace
+        self._tail = "" # Held back in case it is the closing fence or trailing whitespace
+
+    def _strip_head(self, text: str) -> str:
+        # Sometimes Claude might still wrap in ```html ... ``` despite instructions
+        for fence in self._OPENING_FENCES:
+            if text.startswith(fence):
+                return text[len(fence):]
+        return text
+
+    def feed(self, text: str) -> str:
+        if self._in_head:
+            self._head = (self._head + text).lstrip()
+            longest = self._OPENING_FENCES[0]
+            if len(self._head) < len(longest) and longest.startswith(self._head):
+                return ""
+            text = self._strip_head(self._head)
+            self._head = ""
+            self._in_head = False
+
+        pending = self._tail + text
+        # Hold back trailing whitespace, a possible closing fence, and any whitespace before it
+        cut = len(pending.rstrip()) - len(self._FENCE)
+        while cut > 0 and pending[cut - 1].isspace():
+            cut -= 1
+        if cut <= 0:
+            self._tail = pending
+            return ""
+        self._tail = pending[cut:]
+        chunk = pending[:cut]
+        if self._leading:
+            chunk = chunk.lstrip()
+            self._leading = not chunk
+        return chunk
+
+    def finish(self) -> str:
+        # If still in the head, the whole response was no longer than the opening fence
+        tail = (self._strip_head(self._head) if self._in_head else self._tail).rstrip()
+        if tail.endswith(self._FENCE):
+            tail = tail[:-len(self._FENCE)]
+        return tail.strip() if self._leading else tail.rstrip()
+
+class _HTMLFileWriter:
+    """Writes streamed HTML to a temporary file beside file_path and moves it into place on commit,
+    so a failed or empty generation never leaves a partial file or clobbers an existing one."""
+
+    def __init__(self, file_path: str, strip_fences: bool = True):
+        self.file_path = file_path
+        self._file, self._tmp_path = open_temp_for_write(file_path)
+        # HTML from the prompt cache was already stripped when it was generated
+        self._stripper = _FenceStripper() if strip_fences else None
+        self._parts: List[str] = [] # Kept for the prompt cache and the reported length
+
+    def _append(self, chunk: str):
+        if chunk:
+            self._file.write(chunk)
+            self._parts.append(chunk)
+
+    def write(self, text: str):
+        self._append(self._stripper.feed(text) if self._stripper else text)
+
+    def commit(self) -> str:
+        """Finishes the file and returns the HTML written; an empty result removes the file instead."""
+        if self._stripper:
+            self._append(self._stripper.finish())
+        self._file.close()
+        generated_html = "".join(self._parts)
+        if generated_html:
+            os.replace(self._tmp_path, self.file_path)
+        else:
+            os.remove(self._tmp_path)
+        return generated_html
+
+    def finish_message(self, final_message: Any):
+        # The stop sequence is not part of the streamed text, so put the closing tag back
+        if final_message.stop_reason == "stop_sequence":
+            self.write(final_message.stop_sequence)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    @classmethod
+    async def aopen(cls, file_path: str) -> "_HTMLFileWriter":
+        """Creates the writer in a worker thread, discarding its temp file if the caller is cancelled meanwhile."""
+        loop = asyncio.get_running_loop()
+        opening = loop.run_in_executor(None, cls, file_path)
+        try:
+            # Shielded so a cancellation leaves the future to finish, and the temp file it creates can be removed
+            return await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            def discard(future: "asyncio.Future[_HTMLFileWriter]"):
+                if not future.cancelled() and future.exception() is None:
+                    loop.run_in_executor(None, future.result().abort)
+            opening.add_done_callback(discard)
+            raise
+
+    # Leaving the block through an exception (including cancellation) discards the temp file
+    def __enter__(self) -> "_HTMLFileWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any):
+        if exc_type is not None:
+            self.abort()
+
+    async def __aenter__(self) -> "_HTMLFileWriter":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any):
+        if exc_type is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.abort)
 
 class GenerateHTMLInput(BaseModel):
     file_path: str = Field(..., description="The full path where the HTML file should be saved, e.g., 'output/my_page.html'.")
@@ -17,75 +153,73 @@ class HTMLGeneratorTool(ToolBase):
     description = "Generates an HTML file based on a user prompt and saves it to the specified path. This tool will call another AI to generate the HTML content."
     input_schema = GenerateHTMLInput
 
-    def _get_sub_client(self):
-        if not SUB_CLIENT_API_KEY:
-            logger.error("CLAUDE_API_KEY not found for HTMLGeneratorTool's sub-client.")
-            return None
-        return anthropic.Anthropic(api_key=SUB_CLIENT_API_KEY)
+    def _generation_params(self, prompt_for_html: str) -> Dict[str, Any]:
+        return {
+            **generation_params(_HTML_SYSTEM_PROMPT, prompt_for_html, max_tokens=4000), # Allow ample space for HTML
+            "stop_sequences": [_CLOSING_TAG],
+        }
 
-    def execute(self, file_path: str, prompt_for_html: str, **kwargs: Any) -> str:
+    def _cached_html(self, file_path: str, prompt_for_html: str) -> Optional[str]:
         logger.info(f"HTMLGeneratorTool: Received request to create {file_path} with prompt: '{prompt_for_html[:50]}...'")
-        sub_client = self._get_sub_client()
-        if not sub_client:
-            return "Error: Sub-client for HTML generation could not be initialized due to missing API key."
-
-        html_generation_prompt = f"""
-        Please generate complete, well-formed HTML code based on the following request. 
-        Only output the HTML code itself, with no other explanatory text, preamble, or markdown code fences. 
-        Ensure all tags are properly closed and the structure is valid.
-        Include CSS within <style> tags in the <head> if styling is requested or implied by the prompt.
-        If JavaScript is needed for simple interactivity as per the prompt, include it within <script> tags at the end of the <body>.
-        Request: {prompt_for_html}
-        """
+        cached_html = _prompt_cache.get(prompt_for_html)
+        if cached_html is not None:
+            logger.debug("Serving HTML from the prompt cache.")
+        return cached_html
 
-        try:
-            logger.debug("Calling sub-Claude for HTML generation.")
-            # Using a simpler model for potentially faster/cheaper generation if desired, user can tune
-            # For now, using the same model family as main agent for consistency, but Haiku is good for this.
-            # User's latest preference was claude-3-5-haiku-20241022, let's try that here. If not available, they can change.
-            response = sub_client.messages.create(
-                model="claude-3-haiku-20240307", # Or user specified: "claude-3-5-haiku-20241022"
-                max_tokens=4000, # Allow ample space for HTML
-                messages=[{"role": "user", "content": html_generation_prompt}]
-            )
-            logger.debug(f"Sub-Claude HTML generation response object: {response}")
-
-            generated_html = ""
-            if response.content and isinstance(response.content, list) and len(response.content) > 0:
-                # Expecting a single text block with the HTML
-                if response.content[0].type == "text":
-                    generated_html = response.content[0].text
-                    # Sometimes Claude might still wrap in ```html ... ``` despite instructions
-                    if generated_html.startswith("```html\n"):
-                        generated_html = generated_html[len("```html\n"):]
-                    if generated_html.endswith("\n```"):
-                        generated_html = generated_html[:-len("\n```")]
-                    generated_html = generated_html.strip()
-                else:
-                    logger.warning("Sub-Claude HTML generation did not return a text block as expected.")
-                    return "Error: Sub-AI did not return HTML in the expected format."
-            else:
-                logger.warning("Sub-Claude HTML generation returned no content.")
-                return "Error: Sub-AI returned no content for HTML generation."
-
-            if not generated_html:
-                logger.warning("Generated HTML content is empty after processing.")
-                return "Error: Generated HTML content was empty."
-
-            # Create directory for file_path if it doesn't exist
-            dir_name = os.path.dirname(file_path)
-            if dir_name:
-                os.makedirs(dir_name, exist_ok=True)
-
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(generated_html)
-            
-            logger.success(f"Successfully generated and saved HTML to {file_path}")
-            return f"Successfully generated HTML and saved to {file_path}. Content length: {len(generated_html)} bytes."
-
-        except anthropic.APIError as e:
+    def _saved_result(self, generated_html: str, file_path: str, prompt_for_html: str) -> str:
+        if not generated_html:
+            logger.warning("Generated HTML content is empty after processing.")
+            return "Error: Generated HTML content was empty."
+
+        _prompt_cache.put(prompt_for_html, generated_html)
+        logger.success(f"Successfully generated and saved HTML to {file_path}")
+        return f"Successfully generated HTML and saved to {file_path}. Content length: {len(generated_html)} bytes."
+
+    def _write_cached(self, cached_html: str, file_path: str, prompt_for_html: str) -> str:
+        # Goes through the same write-then-rename as generated output, so a failed write never truncates file_path
+        with _HTMLFileWriter(file_path, strip_fences=False) as writer:
+            writer.write(cached_html)
+            return self._saved_result(writer.commit(), file_path, prompt_for_html)
+
+    def _error_result(self, e: Exception, file_path: str) -> str:
+        if isinstance(e, anthropic.APIError):
             logger.error(f"Sub-Claude API error during HTML generation: {e}")
             return f"Error during HTML generation (API Error): {e}"
+        logger.error(f"Failed to generate or save HTML file {file_path}. Error: {e}")
+        return f"Failed to generate or save HTML file {file_path}. Error: {e}"
+
+    def execute(self, file_path: str, prompt_for_html: str, **kwargs: Any) -> str:
+        cached_html = self._cached_html(file_path, prompt_for_html)
+        try:
+            if cached_html is not None:
+                return self._write_cached(cached_html, file_path, prompt_for_html)
+
+            # Each chunk is written as it arrives, so disk writes overlap with generation instead of following it
+            with _HTMLFileWriter(file_path) as writer:
+                with self._shared_anthropic_client().messages.stream(**self._generation_params(prompt_for_html)) as stream:
+                    for text in stream.text_stream:
+                        writer.write(text)
+                    writer.finish_message(stream.get_final_message())
+                generated_html = writer.commit()
+            return self._saved_result(generated_html, file_path, prompt_for_html)
+        except Exception as e:
+            return self._error_result(e, file_path)
+
+    async def aexecute(self, file_path: str, prompt_for_html: str, **kwargs: Any) -> str:
+        cached_html = self._cached_html(file_path, prompt_for_html)
+        loop = asyncio.get_running_loop()
+        try:
+            if cached_html is not None:
+                return await loop.run_in_executor(None, self._write_cached, cached_html, file_path, prompt_for_html)
+
+            # Opening, finishing and discarding the file happen in a worker thread; chunk writes only fill the file buffer
+            writer = await _HTMLFileWriter.aopen(file_path)
+            async with writer:
+                async with self._shared_async_anthropic_client().messages.stream(**self._generation_params(prompt_for_html)) as stream:
+                    async for text in stream.text_stream:
+                        writer.write(text)
+                    writer.finish_message(await stream.get_final_message())
+                generated_html = await loop.run_in_executor(None, writer.commit)
+            return self._saved_result(generated_html, file_path, prompt_for_html)
         except Exception as e:
-            logger.error(f"Failed to generate or save HTML file {file_path}. Error: {e}")
-            return f"Failed to generate or save HTML file {file_path}. Error: {e}" 
\ No newline at end of file
+            return self._error_result(e, file_path)
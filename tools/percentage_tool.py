@@ -10,6 +10,7 @@ class PercentageTool(ToolBase):
     name = "calculate_percentage"
     description = "Calculates a percentage of a given number. For example, 'What is 17% of 420?'."
     input_schema = PercentageInput
+    cacheable = True
 
     def execute(self, base_number: float, percentage: float, **kwargs: Any) -> Any:
         return (percentage / 100) * base_number
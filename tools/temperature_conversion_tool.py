@@ -1,12 +1,22 @@
 from pydantic import BaseModel, Field
 from enum import Enum
 from .tool_base import ToolBase # Relative import
-from typing import Any
+from typing import Any, Callable, Dict, Tuple
 
 class TemperatureUnit(str, Enum):
     CELSIUS = "C"
     FAHRENHEIT = "F"
 
+# (from_unit, to_unit) -> conversion function, including the identity pairs so execute never branches.
+# The formulas are kept as written rather than folded into a precomputed value * a + b,
+# which would introduce rounding noise (37 C would come out as 98.60000000000001 F).
+_CONVERSIONS: Dict[Tuple[TemperatureUnit, TemperatureUnit], Callable[[float], float]] = {
+    (TemperatureUnit.CELSIUS, TemperatureUnit.CELSIUS): lambda value: value,
+    (TemperatureUnit.FAHRENHEIT, TemperatureUnit.FAHRENHEIT): lambda value: value,
+    (TemperatureUnit.CELSIUS, TemperatureUnit.FAHRENHEIT): lambda value: (value * 9/5) + 32,
+    (TemperatureUnit.FAHRENHEIT, TemperatureUnit.CELSIUS): lambda value: (value - 32) * 5/9,
+}
+
 class TemperatureConversionInput(BaseModel):
     value: float = Field(..., description="The temperature value to convert.")
     from_unit: TemperatureUnit = Field(..., description="The unit to convert from (Celsius or Fahrenheit).")
@@ -16,15 +26,13 @@ class TemperatureConversionTool(ToolBase):
     name = "convert_temperature"
     description = "Converts temperatures between Celsius (C) and Fahrenheit (F)."
     input_schema = TemperatureConversionInput
+    cacheable = True
 
     def execute(self, value: float, from_unit: TemperatureUnit, to_unit: TemperatureUnit, **kwargs: Any) -> Any:
-        if from_unit == to_unit:
-            return value
-        if from_unit == TemperatureUnit.CELSIUS and to_unit == TemperatureUnit.FAHRENHEIT:
-            return (value * 9/5) + 32
-        elif from_unit == TemperatureUnit.FAHRENHEIT and to_unit == TemperatureUnit.CELSIUS:
-            return (value - 32) * 5/9
-        return "Invalid temperature units for conversion."
+        convert = _CONVERSIONS.get((from_unit, to_unit))
+        if convert is None:
+            return "Invalid temperature units for conversion."
+        return convert(value)
 
 # The old schema dictionary is no longer needed here
 # temperature_conversion_schema = {
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from enum import Enum
 from .tool_base import ToolBase # Relative import
-from typing import Any
+from typing import Any, Dict, Tuple
 
 class TimeUnit(str, Enum):
     SECONDS = "seconds"
@@ -9,6 +9,23 @@ class TimeUnit(str, Enum):
     HOURS = "hours"
     DAYS = "days"
 
+# Seconds per unit
+_SECONDS_PER_UNIT: Dict[TimeUnit, int] = {
+    TimeUnit.SECONDS: 1,
+    TimeUnit.MINUTES: 60,
+    TimeUnit.HOURS: 3600,
+    TimeUnit.DAYS: 86400
+}
+
+# (from_unit, to_unit) -> (multiplier, divisor), so a conversion is one lookup and no branching.
+# The multiply-then-divide form is kept instead of a single precomputed ratio, which would
+# introduce visible rounding noise (0.1 days would come out as 2.4000000000000004 hours).
+_TIME_FACTORS: Dict[Tuple[TimeUnit, TimeUnit], Tuple[int, int]] = {
+    (from_unit, to_unit): (1, 1) if from_unit is to_unit else (_SECONDS_PER_UNIT[from_unit], _SECONDS_PER_UNIT[to_unit])
+    for from_unit in TimeUnit
+    for to_unit in TimeUnit
+}
+
 class TimeConversionInput(BaseModel):
     value: float = Field(..., description="The time value to convert.")
     from_unit: TimeUnit = Field(..., description="The unit to convert from.")
@@ -18,24 +35,14 @@ class TimeConversionTool(ToolBase):
     name = "convert_time"
     description = "Converts time durations between seconds, minutes, hours, and days."
     input_schema = TimeConversionInput
+    cacheable = True
 
     def execute(self, value: float, from_unit: TimeUnit, to_unit: TimeUnit, **kwargs: Any) -> Any:
-        if from_unit == to_unit:
-            return value
-
-        to_seconds_factors = {
-            TimeUnit.SECONDS: 1,
-            TimeUnit.MINUTES: 60,
-            TimeUnit.HOURS: 3600,
-            TimeUnit.DAYS: 86400
-        }
-
-        if from_unit not in to_seconds_factors or to_unit not in to_seconds_factors:
+        factors = _TIME_FACTORS.get((from_unit, to_unit))
+        if factors is None:
             return "Invalid time units for conversion."
-
-        value_in_seconds = value * to_seconds_factors[from_unit]
-        
-        return value_in_seconds / to_seconds_factors[to_unit]
+        multiplier, divisor = factors
+        return value * multiplier / divisor
 
 # The old schema dictionary is no longer needed here
 # time_conversion_schema = {
@@ -1,19 +1,98 @@
+import asyncio
+import functools
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
-from typing import Dict, Any, Type
+from pydantic import BaseModel, TypeAdapter
+from typing import TYPE_CHECKING, Dict, Any, Tuple, Type
+
+if TYPE_CHECKING:
+    import anthropic
 
 class ToolBase(ABC):
     name: str
     description: str
     input_schema: Type[BaseModel]
+    # Whether calls may run concurrently with other calls from the same response
+    parallel_safe: bool = True
+    # Whether results depend only on the input, so repeated calls can be served from cache
+    cacheable: bool = False
+
+    # Built once per tool class when it is defined, and shared by every instance
+    _adapter: TypeAdapter
+    _input_fields: Tuple[str, ...]
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        if "input_schema" in cls.__dict__: # Subclasses that reuse a parent's schema also reuse its adapter
+            cls._adapter = TypeAdapter(cls.input_schema)
+            cls._input_fields = tuple(cls.input_schema.model_fields)
+
+    def validate_input(self, raw_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Validates raw tool input from the model and returns it as keyword arguments for execute."""
+        validated_input = self._adapter.validate_python(raw_input)
+        # Fields are read straight off the model, skipping the dict model_dump() would build
+        return {field: getattr(validated_input, field) for field in self._input_fields}
 
     @abstractmethod
     def execute(self, **kwargs: Any) -> Any:
         pass
 
-    def get_anthropic_schema(self) -> Dict[str, Any]:
+    async def aexecute(self, **kwargs: Any) -> Any:
+        # Default: run the synchronous execute in the default executor.
+        # Tools that do network I/O override this with a native async implementation.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.execute, **kwargs))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _shared_anthropic_client() -> "anthropic.Anthropic":
+        # One client for every tool, so its HTTP/2 keep-alive pool is reused across calls
+        # instead of a fresh TCP+TLS handshake each time. Imported here so tools that never
+        # call another Claude don't pay for the SDK import.
+        import anthropic
+        from ._sub_claude import sub_client_api_key
+        return anthropic.Anthropic(
+            api_key=sub_client_api_key(),
+            max_retries=2,
+            http_client=anthropic.DefaultHttpxClient(http2=True),
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _shared_async_anthropic_client() -> "anthropic.AsyncAnthropic":
+        # Async counterpart of _shared_anthropic_client: parallel tool calls multiplex over
+        # one HTTP/2 connection pool. The agent runs on a single event loop for its lifetime,
+        # so the loop-bound connections are safe to share.
+        import anthropic
+        import httpx
+        from ._sub_claude import sub_client_api_key
+        return anthropic.AsyncAnthropic(
+            api_key=sub_client_api_key(),
+            max_retries=2,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                http2=True,
+                timeout=60,
+                # Same keep-alive expiry as the main client in main.py, so idle pooled connections are recycled alike
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30),
+            ),
+        )
+
+    @staticmethod
+    async def aclose_shared_clients() -> None:
+        """Closes the shared sub-Claude clients, if any tool created them, releasing their connection pools."""
+        if ToolBase._shared_anthropic_client.cache_info().currsize:
+            ToolBase._shared_anthropic_client().close()
+            ToolBase._shared_anthropic_client.cache_clear()
+        if ToolBase._shared_async_anthropic_client.cache_info().currsize:
+            await ToolBase._shared_async_anthropic_client().close()
+            ToolBase._shared_async_anthropic_client.cache_clear()
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get_anthropic_schema(cls) -> Dict[str, Any]:
+        # model_json_schema() is not cheap and the schema never changes for a tool class,
+        # so it is built once per class and shared by every instance
         return {
-            "name": self.name,
-            "description": self.description,
-            "input_schema": self.input_schema.model_json_schema()
-        } 
\ No newline at end of file
+            "name": cls.name,
+            "description": cls.description,
+            "input_schema": cls.input_schema.model_json_schema()
+        }